@@ -0,0 +1,53 @@
+import json
+import statistics
+import time
+from agents.voice_assistant import ReplyGovernor
+
+def load_response_lengths(log_path: str) -> dict:
+    """Map each logged query to the word count of its recorded response"""
+    try:
+        with open(log_path, 'r') as f:
+            logs = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read {log_path} for mock reply lengths: {e}")
+        return {}
+    return {log["query"]: len(log.get("response", "").split()) for log in logs if log.get("query")}
+
+class MockGroqClient:
+    """Stands in for DirectGroqClient, mimicking recorded reply lengths and generation speed"""
+    def __init__(self, response_words: dict, first_token_latency: float = 0.25, tokens_per_second: float = 250.0):
+        self.response_words = response_words
+        self.default_words = int(statistics.mean(self.response_words.values())) if self.response_words else 50
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+
+    def _words_for(self, prompt: str) -> int:
+        # Contextual prompts end with the current message; plain prompts are the query itself
+        marker = "Current user message: "
+        if marker in prompt:
+            prompt = prompt.split(marker, 1)[1].split("\n\n", 1)[0]
+        return self.response_words.get(prompt, self.default_words)
+
+    def _chunks(self, words: int, max_tokens: int, cancelled):
+        if cancelled():
+            return
+        time.sleep(self.first_token_latency)
+        # Roughly 1.3 tokens per English word; end a sentence every dozen words
+        per_word = 1.3 / self.tokens_per_second
+        words = min(words, int(max_tokens / 1.3))
+        for i in range(words):
+            if cancelled():
+                return
+            time.sleep(per_word)
+            yield "word." if i == words - 1 or i % 12 == 11 else "word"
+            if i < words - 1:
+                yield " "
+
+    def stream_messages(self, messages: list, max_tokens: int = 1000, word_budget: int | None = None,
+                        cancelled=lambda: False) -> ReplyGovernor:
+        # Run the real governor over mock output so replies are capped exactly as in production
+        words = self._words_for(messages[-1]["content"])
+        return ReplyGovernor(self._chunks(words, max_tokens, cancelled), word_budget)
+
+    def generate_response(self, prompt: str) -> str:
+        return "".join(self._chunks(self._words_for(prompt), 1000, lambda: False))
@@ -1,31 +1,144 @@
+import re
+import threading
+from typing import Callable, Iterable, Iterator
 from crewai import Agent
 from groq import Groq
 from config import Config
+from tasks.pipeline import MessageBuilder
+
+CONTINUE_PROMPT = "Please continue from where you left off, keeping the same conversational tone."
+
+# Replies are cut at the first sentence end once the word budget is reached
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*(?=\s)')
+# Only a bare request to continue resumes a cut-off reply; "what else can I cook?" is a new question
+CONTINUATION_REQUEST = re.compile(
+    r"^\W*(please\W+)?(tell me more|more please|go on|keep going|continue|what else)(\W+(about (it|that)|please))*\W*$",
+    re.IGNORECASE
+)
+DETAILED_HINTS = re.compile(
+    r"\b(explain|describe|how (do|does|can|to)|why|steps?|compare|difference|list|recommend\w*|suggest\w*|tell me about)\b",
+    re.IGNORECASE
+)
+SMALL_TALK = re.compile(r"^\W*(hi|hello|hey|thanks|thank you|ok|okay|cool|great|bye|good (morning|afternoon|evening|night))\b", re.IGNORECASE)
+QUESTION_HINTS = re.compile(r"\?|\b(what|who|where|when|which|how|why|can|could|do|does|is|are)\b", re.IGNORECASE)
+
+def classify_query(query: str) -> str:
+    """Pick a reply budget class for a query: brief, standard or detailed"""
+    if DETAILED_HINTS.search(query):
+        return "detailed"
+    if SMALL_TALK.match(query) or (len(query.split()) <= 4 and not QUESTION_HINTS.search(query)):
+        return "brief"
+    return "standard"
+
+class ReplyGovernor:
+    """Wraps a stream of reply chunks and stops it at the first sentence boundary past `word_budget`.
+
+    After iteration `text` holds what was emitted and `truncated` tells whether
+    the model had more to say (cut by the governor or by the token cap).
+    """
+    def __init__(self, chunks: Iterable[str] | None = None, word_budget: int | None = None):
+        self.chunks = chunks
+        self.word_budget = word_budget
+        self.text = ""
+        self.truncated = False
+    
+    def mark_truncated(self):
+        self.truncated = True
+    
+    def __iter__(self) -> Iterator[str]:
+        scan_from = None
+        try:
+            for chunk in self.chunks:
+                start = len(self.text)
+                self.text += chunk
+                if self.word_budget and scan_from is None and len(self.text.split()) >= self.word_budget:
+                    scan_from = start
+                if scan_from is not None:
+                    match = SENTENCE_END.search(self.text, scan_from)
+                    if match:
+                        end = match.end()
+                        if end > start:
+                            yield self.text[start:end]
+                        self.text = self.text[:end]
+                        self.truncated = True
+                        return
+                yield chunk
+        finally:
+            # Stopping early must also stop generation upstream
+            close = getattr(self.chunks, "close", None)
+            if close:
+                close()
 
 class DirectGroqClient:
     """Direct Groq client that bypasses CrewAI's LLM system"""
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, messages: MessageBuilder | None = None):
         self.client = Groq(api_key=api_key)
         self.model = "llama-3.1-8b-instant"
+        self.messages = messages or MessageBuilder()
+    
+    def build_messages(self, prompt: str, word_budget: int = 100) -> list:
+        return self.messages.wrap(prompt, word_budget)
     
     def generate_response(self, prompt: str) -> str:
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a friendly voice assistant. Give concise, conversational responses under 100 words."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self.build_messages(prompt),
                 temperature=0.7,
                 max_tokens=1000
             )
             return response.choices[0].message.content
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}"
+    
+    def _stream_chunks(self, messages: list, max_tokens: int, cancelled: Callable[[], bool],
+                       on_token_cap: Callable[[], None]) -> Iterator[str]:
+        # A turn cancelled before generation starts must not cost an API request
+        if cancelled():
+            return
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=max_tokens,
+                stream=True
+            )
+        except Exception as e:
+            yield f"I apologize, but I encountered an error: {str(e)}"
+            return
+        try:
+            for chunk in stream:
+                if cancelled():
+                    break
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    yield choice.delta.content
+                if choice.finish_reason == "length":
+                    on_token_cap()
+        finally:
+            # Release the HTTP connection so cancelled generations stop consuming tokens
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    
+    def stream_messages(self, messages: list, max_tokens: int = 1000, word_budget: int | None = None,
+                        cancelled: Callable[[], bool] = lambda: False) -> ReplyGovernor:
+        """Stream a reply to `messages`, governed by `word_budget`, stopping early once `cancelled()` is true"""
+        governor = ReplyGovernor(word_budget=word_budget)
+        governor.chunks = self._stream_chunks(messages, max_tokens, cancelled, governor.mark_truncated)
+        return governor
 
 class VoiceAssistantAgent:
     def __init__(self, groq_api_key: str):
-        self.groq_client = DirectGroqClient(groq_api_key)
+        # Compile prompt templates for every reply budget once, up front
+        self.messages = MessageBuilder(budget["words"] for budget in Config.VOICE_REPLY_BUDGETS.values())
+        self.groq_client = DirectGroqClient(groq_api_key, self.messages)
+        # Cached conversation state for replies that were cut short, per session
+        self.continuations: dict[str | None, dict] = {}
+        self.continuations_lock = threading.Lock()
         
         # Create agent WITHOUT LLM to avoid litellm
         self.agent = Agent(
@@ -37,24 +150,45 @@ class VoiceAssistantAgent:
             # NO LLM parameter!
         )
     
-    def process_query(self, query: str, history: list | None = None) -> str:
+    def has_continuation(self, session_id: str | None) -> bool:
+        return session_id in self.continuations
+    
+    def _plan_turn(self, query: str, history: list | None, session_id: str | None) -> tuple[list, str]:
+        with self.continuations_lock:
+            continuation = self.continuations.get(session_id)
+        if continuation and CONTINUATION_REQUEST.match(query):
+            # Resume from the cached context instead of starting a fresh answer
+            return continuation["messages"] + [{"role": "user", "content": CONTINUE_PROMPT}], continuation["query_class"]
+        query_class = classify_query(query)
+        budget = Config.VOICE_REPLY_BUDGETS[query_class]
+        return self.messages.build(query, history, budget["words"]), query_class
+    
+    def _remember(self, session_id: str | None, messages: list, query_class: str, reply: ReplyGovernor):
+        with self.continuations_lock:
+            self.continuations.pop(session_id, None)
+            if reply.truncated:
+                self.continuations[session_id] = {
+                    "messages": messages + [{"role": "assistant", "content": reply.text}],
+                    "query_class": query_class
+                }
+                # Bound memory: forget the oldest pending continuations first
+                while len(self.continuations) > Config.MAX_PENDING_CONTINUATIONS:
+                    self.continuations.pop(next(iter(self.continuations)), None)
+    
+    def stream_query(self, query: str, history: list | None = None,
+                     cancelled: Callable[[], bool] = lambda: False,
+                     session_id: str | None = None) -> Iterator[str]:
+        """Yield the reply incrementally, capped to the voice budget for this kind of query"""
+        messages, query_class = self._plan_turn(query, history, session_id)
+        budget = Config.VOICE_REPLY_BUDGETS[query_class]
+        reply = self.groq_client.stream_messages(messages, budget["max_tokens"], budget["words"], cancelled)
+        yield from reply
+        if not cancelled():
+            self._remember(session_id, messages, query_class, reply)
+    
+    def process_query(self, query: str, history: list | None = None, session_id: str | None = None) -> str:
         """Process query directly, optionally using short conversation history for context"""
-        if history:
-            # Build a compact context prefix from recent exchanges
-            recent_pairs = history[-5:]  # limit context size
-            context_lines = []
-            for item in recent_pairs:
-                user = item.get("query")
-                assistant = item.get("response")
-                if user:
-                    context_lines.append(f"User: {user}")
-                if assistant:
-                    context_lines.append(f"Assistant: {assistant}")
-            context = "\n".join(context_lines)
-            prompt = f"Context from previous conversation (most recent first):\n{context}\n\nCurrent user message: {query}\n\nPlease answer concisely while respecting the context."
-        else:
-            prompt = query
-        return self.groq_client.generate_response(prompt)
+        return "".join(self.stream_query(query, history=history, session_id=session_id))
 
 class LoggerAgent:
     def __init__(self, groq_api_key: str):
@@ -9,9 +9,22 @@ class Config:
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
     GROQ_MODEL = 'llama-3.1-8b-instant'
     
+    # Voice reply budgets per query class: replies stop at the first sentence end past
+    # `words`; `max_tokens` is the hard generation cap
+    VOICE_REPLY_BUDGETS = {
+        'brief': {'words': 25, 'max_tokens': 80},
+        'standard': {'words': 60, 'max_tokens': 160},
+        'detailed': {'words': 100, 'max_tokens': 260},
+    }
+    MAX_PENDING_CONTINUATIONS = 1000
+    
     # Speech Recognition Settings
     SPEECH_RECOGNITION_TIMEOUT = 5
     SPEECH_RECOGNITION_PHRASE_TIMEOUT = 1
+    MICROPHONE_NAME = os.getenv('VOICEBOT_MICROPHONE')   # substring of the device name; first device if unset
+    MIC_CALIBRATION_PATH = os.path.join(BASE_DIR, 'logs', 'mic_calibration.json')
+    NOISE_TRACKING_WINDOW = 0.2     # seconds of audio per background noise-level update
+    NOISE_CALIBRATION_SAVE_INTERVAL = 60
     
     # Text-to-Speech Settings
     TTS_RATE = 200
@@ -20,10 +33,36 @@ class Config:
     # JSON Logging (absolute path to project logs)
     LOG_FILE_PATH = os.path.join(BASE_DIR, 'logs', 'user_queries.json')
     
+    # Write-ahead journal for log entries and session history; replayed on startup
+    JOURNAL_PATH = os.path.join(BASE_DIR, 'logs', 'interactions.journal')
+    SESSION_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'logs', 'sessions.json')
+    JOURNAL_CHECKPOINT_INTERVAL = 50   # records between snapshots of the log file and sessions
+    SESSION_RETENTION_DAYS = 7
+    
     # Flask Settings
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = 5000
     FLASK_DEBUG = True
+    
+    # Admission control for the web API
+    MAX_CONCURRENT_REQUESTS = 4
+    SESSION_RATE_LIMIT = 0.5       # sustained requests per second per session
+    SESSION_BURST = 5              # requests a session may burst above the rate
+    MAX_QUEUED_REQUESTS = 32
+    REQUEST_DEADLINE = 30          # seconds; clients may ask for less via X-Request-Deadline
+    
+    # On-demand profiling (hooks are only installed when enabled)
+    PROFILING_ENABLED = os.getenv('VOICEBOT_PROFILING', 'false').lower() == 'true'
+    PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    PROFILE_MAX_WINDOW = 300       # seconds
+    PROFILE_MAX_KEPT = 50          # newest profiles kept in PROFILE_DIR; older ones are deleted
+    ADMIN_TOKEN = os.getenv('VOICEBOT_ADMIN_TOKEN')
+    
+    # Serve replies from agents/mock_llm.py instead of Groq, e.g. for test/replay_workload.py
+    MOCK_LLM = os.getenv('VOICEBOT_MOCK_LLM', 'false').lower() == 'true'
+    MOCK_LLM_FIRST_TOKEN_LATENCY = float(os.getenv('VOICEBOT_MOCK_LLM_LATENCY', '0.25'))   # seconds
+    MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv('VOICEBOT_MOCK_LLM_TPS', '250'))
 
 # Ensure no OpenAI fallback
 if 'OPENAI_API_KEY' in os.environ:
@@ -1,26 +1,37 @@
 import asyncio
 import json
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from agents.voice_assistant import VoiceAssistantAgent, LoggerAgent
 from tools.speech_tools import SpeechRecognitionTool, TextToSpeechTool
 from tools.json_logger import JSONLoggerTool
+from tools.journal import WriteAheadJournal
+from tools.session_store import SessionHistoryStore
 from config import Config
 
 class VoiceBot:
     def __init__(self, init_audio: bool = True):
         self.config = Config
-        # Simple in-memory conversation history per session_id
-        self.session_histories: dict[str, list[dict]] = {}
+        # Log entries and session histories are journaled together and restored on startup
+        self.journal = WriteAheadJournal(self.config.JOURNAL_PATH, self.config.JOURNAL_CHECKPOINT_INTERVAL)
+        self.sessions = SessionHistoryStore(
+            self.config.SESSION_SNAPSHOT_PATH,
+            self.journal,
+            retention=timedelta(days=self.config.SESSION_RETENTION_DAYS)
+        )
+        self.session_histories: dict[str, list[dict]] = self.sessions.histories
         
         # Initialize tools (audio tools optional for web environments)
         if init_audio:
+            # Set while TTS plays so the microphone does not calibrate on the bot's own voice
+            speaking = threading.Event()
             try:
-                self.speech_recognition = SpeechRecognitionTool()
+                self.speech_recognition = SpeechRecognitionTool(speaking=speaking)
             except Exception as e:
                 print(f"Warning: Failed to initialize microphone: {e}")
                 self.speech_recognition = None
             try:
-                self.text_to_speech = TextToSpeechTool()
+                self.text_to_speech = TextToSpeechTool(speaking=speaking)
             except Exception as e:
                 print(f"Warning: Failed to initialize text-to-speech: {e}")
                 self.text_to_speech = None
@@ -28,25 +39,31 @@ class VoiceBot:
             self.speech_recognition = None
             self.text_to_speech = None
         
-        self.json_logger = JSONLoggerTool(self.config.LOG_FILE_PATH)
+        self.json_logger = JSONLoggerTool(self.config.LOG_FILE_PATH, journal=self.journal)
+        self.journal.recover()
         
         # Initialize agents WITHOUT CrewAI crew system
         self.voice_assistant = VoiceAssistantAgent(self.config.GROQ_API_KEY)
         self.logger_agent = LoggerAgent(self.config.GROQ_API_KEY)
     
+    def close(self):
+        """Release the microphone (saving its calibration) and flush the journal"""
+        if self.speech_recognition:
+            self.speech_recognition.close()
+        self.journal.close()
+    
     def _get_history(self, session_id: str) -> list:
-        return self.session_histories.get(session_id, [])
+        return self.sessions.get(session_id)
 
-    def _append_history(self, session_id: str, query: str, response: str):
-        history = self.session_histories.setdefault(session_id, [])
-        history.append({
-            "timestamp": datetime.now().isoformat(),
-            "query": query,
-            "response": response
-        })
-        # keep last N to bound memory
-        if len(history) > 50:
-            self.session_histories[session_id] = history[-50:]
+    def _record_turn(self, query: str, response: str, query_type: str, session_id: str | None,
+                     remember: bool = True):
+        """Journal the log entry and (if `remember`) the history item, waiting once for both to be durable"""
+        seq = self.json_logger.append_entry(query, response, query_type, session_id)
+        if remember and session_id:
+            seq = self.sessions.record(session_id, query, response)
+        self.journal.wait_durable(seq)
+        self.journal.maybe_checkpoint()
+        print(f"Logged query: {query}")
 
     def process_text_query(self, query: str, session_id: str | None = None) -> dict:
         """Process text query without using CrewAI tasks"""
@@ -57,26 +74,18 @@ class VoiceBot:
             history = self._get_history(session_id) if session_id else []
             
             # Generate response using direct Groq client with context
-            assistant_response = self.voice_assistant.process_query(query, history=history)
+            assistant_response = self.voice_assistant.process_query(query, history=history, session_id=session_id)
             
             print(f"Generated response: {assistant_response}")
             
-            # Log the interaction
-            self.json_logger._run(
-                query=query,
-                response=assistant_response,
-                query_type="direct_interaction",
-                session_id=session_id
-            )
-            
-            # Update in-memory history
-            if session_id:
-                self._append_history(session_id, query, assistant_response)
+            # Log the interaction and update the session history
+            self._record_turn(query, assistant_response, "direct_interaction", session_id)
             
             return {
                 "success": True,
                 "user_query": query,
                 "assistant_response": assistant_response,
+                "has_more": self.voice_assistant.has_continuation(session_id),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -130,14 +139,17 @@ def main():
     # Test text processing
     voicebot = VoiceBot(init_audio=False)
     
-    # Test with a simple query
-    test_query = "Hello, how are you today?"
-    result = voicebot.process_text_query(test_query)
-    
-    if result["success"]:
-        print(f"✅ Success! Response: {result['assistant_response']}")
-    else:
-        print(f"❌ Failed: {result['error']}")
+    try:
+        # Test with a simple query
+        test_query = "Hello, how are you today?"
+        result = voicebot.process_text_query(test_query)
+        
+        if result["success"]:
+            print(f"✅ Success! Response: {result['assistant_response']}")
+        else:
+            print(f"❌ Failed: {result['error']}")
+    finally:
+        voicebot.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
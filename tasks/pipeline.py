@@ -0,0 +1,109 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class TaskTemplate:
+    """Description renderer and expected output for a CrewAI-style task"""
+    def __init__(self, render: Callable[..., str], expected_output: str):
+        self.render = render
+        self.expected_output = expected_output
+
+    def to_crewai_task(self, agent, tools: list, **values: Any):
+        """Adapter for callers that still run crews: build a crewai.Task from this template"""
+        from crewai import Task
+        return Task(
+            description=self.render(**values),
+            agent=agent,
+            tools=tools,
+            expected_output=self.expected_output
+        )
+
+
+def voice_response_description(user_query: str) -> str:
+    return f"""Process the user's voice query: "{user_query}"
+
+Steps to complete:
+1. Understand the user's intent and question
+2. Provide a helpful, accurate, and conversational response
+3. Ensure the response is appropriate for voice output (clear, concise, natural)
+4. Keep responses under 100 words for better voice delivery
+
+Guidelines:
+- Be friendly and professional
+- Provide specific information when possible
+- If you don't know something, admit it honestly
+- Use natural language suitable for speech"""
+
+
+def logging_description(query: str, response: str) -> str:
+    return f"""Log the following interaction:
+User Query: "{query}"
+Assistant Response: "{response}"
+
+Ensure the log entry includes:
+- Timestamp
+- Complete user query
+- Full assistant response
+- Appropriate categorization"""
+
+
+VOICE_RESPONSE_TASK = TaskTemplate(
+    voice_response_description,
+    expected_output="A clear, helpful response suitable for text-to-speech conversion"
+)
+
+LOGGING_TASK = TaskTemplate(
+    logging_description,
+    expected_output="Confirmation that the interaction has been logged successfully"
+)
+
+
+def system_prompt(words: int) -> str:
+    return f"You are a friendly voice assistant. Give concise, conversational responses under {words} words."
+
+
+def context_prompt(context: str, query: str) -> str:
+    return (
+        f"Context from previous conversation (most recent first):\n{context}\n\n"
+        f"Current user message: {query}\n\n"
+        "Please answer concisely while respecting the context."
+    )
+
+
+class MessageBuilder:
+    """Builds chat message lists for the assistant.
+
+    System messages are rendered once per word budget and shared between
+    calls; history is folded into the context prompt with a single join.
+    """
+    def __init__(self, word_budgets: Iterable[int] = (100,), context_turns: int = 5):
+        self.context_turns = context_turns
+        self._system_messages: Dict[int, Dict[str, str]] = {}
+        for words in word_budgets:
+            self.system_message(words)
+
+    def system_message(self, words: int) -> Dict[str, str]:
+        message = self._system_messages.get(words)
+        if message is None:
+            message = {"role": "system", "content": system_prompt(words)}
+            self._system_messages[words] = message
+        return message
+
+    def build_prompt(self, query: str, history: Optional[list] = None) -> str:
+        if not history:
+            return query
+        lines = []
+        for item in history[-self.context_turns:]:
+            user = item.get("query")
+            assistant = item.get("response")
+            if user:
+                lines.append("User: " + user)
+            if assistant:
+                lines.append("Assistant: " + assistant)
+        return context_prompt("\n".join(lines), query)
+
+    def build(self, query: str, history: Optional[list] = None, words: int = 100) -> List[Dict[str, str]]:
+        return [self.system_message(words), {"role": "user", "content": self.build_prompt(query, history)}]
+
+    def wrap(self, prompt: str, words: int = 100) -> List[Dict[str, str]]:
+        """Message list for an already rendered prompt"""
+        return [self.system_message(words), {"role": "user", "content": prompt}]
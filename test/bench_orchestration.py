@@ -0,0 +1,108 @@
+"""Microbenchmark: per-turn prompt and task-description construction before and after tasks.pipeline.
+
+Compares the former hand-built prompts and f-string task descriptions with
+tasks.pipeline's MessageBuilder and TaskTemplates. Both sides only build
+strings; neither path constructs crewai.Task objects per turn.
+
+    python test/bench_orchestration.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks.pipeline import MessageBuilder, VOICE_RESPONSE_TASK, LOGGING_TASK
+
+QUERY = "do you know a novel called Lord of the mysteries"
+RESPONSE = "Lord of the Mysteries is a Chinese web novel by Cuttlefish That Loves Diving. " * 3
+HISTORY = [
+    {"timestamp": "2025-09-04T20:41:51", "query": f"question number {i}", "response": RESPONSE}
+    for i in range(20)
+]
+
+
+def legacy_messages(query: str, history: list) -> list:
+    """The prompt assembly VoiceAssistantAgent and DirectGroqClient did on every call"""
+    if history:
+        recent_pairs = history[-5:]
+        context_lines = []
+        for item in recent_pairs:
+            user = item.get("query")
+            assistant = item.get("response")
+            if user:
+                context_lines.append(f"User: {user}")
+            if assistant:
+                context_lines.append(f"Assistant: {assistant}")
+        context = "\n".join(context_lines)
+        prompt = f"Context from previous conversation (most recent first):\n{context}\n\nCurrent user message: {query}\n\nPlease answer concisely while respecting the context."
+    else:
+        prompt = query
+    return [
+        {"role": "system", "content": "You are a friendly voice assistant. Give concise, conversational responses under 100 words."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def legacy_task_descriptions(query: str, response: str) -> tuple:
+    """The f-string descriptions tasks/voice_tasks.py rebuilt for every query and logging step"""
+    voice = f'''
+        Process the user's voice query: "{query}"
+
+        Steps to complete:
+        1. Understand the user's intent and question
+        2. Provide a helpful, accurate, and conversational response
+        3. Ensure the response is appropriate for voice output (clear, concise, natural)
+        4. Keep responses under 100 words for better voice delivery
+
+        Guidelines:
+        - Be friendly and professional
+        - Provide specific information when possible
+        - If you don't know something, admit it honestly
+        - Use natural language suitable for speech
+        '''
+    logging = f'''
+        Log the following interaction:
+        User Query: "{query}"
+        Assistant Response: "{response}"
+
+        Ensure the log entry includes:
+        - Timestamp
+        - Complete user query
+        - Full assistant response
+        - Appropriate categorization
+        '''
+    return voice, logging
+
+
+def bench(label: str, fn, number: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<44} {best * 1e6:8.2f} us/turn")
+    return best
+
+
+def main():
+    number = 20000
+    builder = MessageBuilder((25, 60, 100))
+
+    assert legacy_messages(QUERY, HISTORY) == builder.build(QUERY, HISTORY, 100)
+
+    print("Prompt / message list construction")
+    before = bench("before: loop + f-strings", lambda: legacy_messages(QUERY, HISTORY), number)
+    after = bench("after: MessageBuilder.build", lambda: builder.build(QUERY, HISTORY, 100), number)
+    print(f"  before/after {before / after:.2f}x")
+
+    print("Task descriptions (voice response + logging)")
+    before = bench("before: f-string descriptions", lambda: legacy_task_descriptions(QUERY, RESPONSE), number)
+    after = bench("after: TaskTemplate.render", lambda: (
+        VOICE_RESPONSE_TASK.render(user_query=QUERY),
+        LOGGING_TASK.render(query=QUERY, response=RESPONSE)
+    ), number)
+    print(f"  before/after {before / after:.2f}x")
+    legacy_chars = sum(map(len, legacy_task_descriptions(QUERY, RESPONSE)))
+    dedented_chars = len(VOICE_RESPONSE_TASK.render(user_query=QUERY)) + len(LOGGING_TASK.render(query=QUERY, response=RESPONSE))
+    print(f"  description size {legacy_chars} -> {dedented_chars} chars (descriptions are stored dedented)")
+
+
+if __name__ == "__main__":
+    main()
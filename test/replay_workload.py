@@ -0,0 +1,290 @@
+"""Replay recorded interaction logs as a workload against VoiceBotWeb or the web API.
+
+Turns logs/user_queries.json into a trace (arrival offsets, sessions, queries and
+recorded response lengths) and replays it at 1x, Nx or max speed. Replies come
+from agents.mock_llm, which sleeps and answers in proportion to the recorded
+response length, so runs are free and repeatable and measure the server rather
+than Groq.
+
+    python test/replay_workload.py --speed 10
+    python test/replay_workload.py --speed max --repeat 20 --concurrency 16
+    VOICEBOT_MOCK_LLM=true python web/app.py
+    python test/replay_workload.py --target http://localhost:5000 --speed 5
+
+For HTTP replays start the server with VOICEBOT_MOCK_LLM=true; the tool refuses to
+replay against a server that would call Groq unless --real-llm is given.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+def load_trace(log_path: str, max_gap: float = 30.0, repeat: int = 1) -> list:
+    """Build a replay trace from the interaction log.
+
+    Idle gaps longer than `max_gap` seconds are compressed to `max_gap` so a
+    trace recorded over days does not replay mostly as silence. With `repeat`
+    the trace is overlaid on itself with distinct session ids, multiplying the
+    load while keeping the arrival pattern.
+    """
+    with open(log_path, 'r') as f:
+        logs = json.load(f)
+    logs = sorted((log for log in logs if log.get("query")), key=lambda log: log["timestamp"])
+
+    base = []
+    offset = 0.0
+    previous = None
+    for log in logs:
+        timestamp = datetime.fromisoformat(log["timestamp"])
+        if previous is not None:
+            offset += min((timestamp - previous).total_seconds(), max_gap)
+        previous = timestamp
+        base.append({
+            "offset": offset,
+            "session_id": log.get("session_id") or "default",
+            "query": log["query"],
+            "response_words": len(log.get("response", "").split())
+        })
+
+    trace = []
+    for copy in range(repeat):
+        for event in base:
+            trace.append(dict(event, session_id=f"replay{copy}-{event['session_id']}"))
+    trace.sort(key=lambda event: event["offset"])
+    return trace
+
+
+class InProcessTarget:
+    def __init__(self, trace: list, args):
+        # The mock never calls Groq, but the real client is still constructed
+        if not Config.GROQ_API_KEY:
+            Config.GROQ_API_KEY = 'replay'
+        from web.voicebot_web import VoiceBotWeb
+        from agents.mock_llm import MockGroqClient
+
+        # Keep replayed turns out of the real interaction log, journal and sessions
+        self.log_dir = tempfile.mkdtemp(prefix="voicebot_replay_")
+        Config.LOG_FILE_PATH = os.path.join(self.log_dir, 'user_queries.json')
+        Config.JOURNAL_PATH = os.path.join(self.log_dir, 'interactions.journal')
+        Config.SESSION_SNAPSHOT_PATH = os.path.join(self.log_dir, 'sessions.json')
+        self.bot = VoiceBotWeb()
+        self.bot.voice_assistant.groq_client = MockGroqClient(
+            {event["query"]: event["response_words"] for event in trace},
+            args.first_token_latency, args.tokens_per_second
+        )
+
+    def send(self, event: dict) -> tuple:
+        result = self.bot.process_text_query(event["query"], session_id=event["session_id"])
+        return (200 if result["success"] else 500), len(result.get("assistant_response", ""))
+
+
+class HTTPTarget:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.url = self.base_url + '/api/process-voice'
+        self.timeout = timeout
+        self.openers = {}
+        self.lock = threading.Lock()
+
+        self.rss_samples = []
+        self.max_rss_mb = None
+        self.sampling_done = threading.Event()
+        self.sampler = None
+
+    def health(self) -> dict:
+        with urllib.request.urlopen(self.base_url + '/api/health', timeout=self.timeout) as response:
+            return json.load(response)
+
+    def uses_mock_llm(self) -> bool:
+        return bool(self.health().get("mock_llm"))
+
+    def _record_memory(self):
+        try:
+            memory = self.health().get("memory") or {}
+        except (OSError, ValueError):
+            return
+        if memory.get("rss_mb") is not None:
+            self.rss_samples.append(memory["rss_mb"])
+        self.max_rss_mb = memory.get("max_rss_mb")
+
+    def _sample_memory(self, interval: float):
+        while not self.sampling_done.wait(interval):
+            self._record_memory()
+
+    def start_memory_sampling(self, interval: float = 0.5):
+        """Poll the server's /api/health memory figures until stop_memory_sampling"""
+        self._record_memory()
+        self.sampler = threading.Thread(target=self._sample_memory, args=(interval,), daemon=True)
+        self.sampler.start()
+
+    def stop_memory_sampling(self) -> dict:
+        self.sampling_done.set()
+        self.sampler.join()
+        self._record_memory()
+        if not self.rss_samples:
+            return {}
+        return {
+            "rss_start": self.rss_samples[0],
+            "rss_peak": max(self.rss_samples),
+            "rss_end": self.rss_samples[-1],
+            "max_rss_since_start": self.max_rss_mb
+        }
+
+    def _opener(self, session_id: str):
+        # One cookie jar per recorded session so the server sees distinct sessions
+        with self.lock:
+            opener = self.openers.get(session_id)
+            if opener is None:
+                opener = urllib.request.build_opener(
+                    urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+                )
+                self.openers[session_id] = opener
+            return opener
+
+    def send(self, event: dict) -> tuple:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"text": event["query"]}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with self._opener(event["session_id"]).open(request, timeout=self.timeout) as response:
+                body = response.read()
+                return response.status, len(body)
+        except urllib.error.HTTPError as e:
+            return e.code, 0
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def replay(trace: list, target, speed: float | None, concurrency: int) -> dict:
+    results = []
+    results_lock = threading.Lock()
+    lags = []
+
+    def run(event: dict, scheduled: float):
+        # Latency is measured from the scheduled arrival, so waiting for a free worker counts
+        try:
+            status, size = target.send(event)
+        except Exception as e:
+            print(f"Request failed: {e}")
+            status, size = 0, 0
+        latency = time.perf_counter() - scheduled
+        with results_lock:
+            results.append({"status": status, "latency": latency, "bytes": size})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for event in trace:
+            if speed is not None:
+                scheduled = start + event["offset"] / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    lags.append(-delay)
+            else:
+                scheduled = time.perf_counter()
+            pool.submit(run, event, scheduled)
+    elapsed = time.perf_counter() - start
+
+    latencies = [r["latency"] for r in results if r["status"] == 200]
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    return {
+        "requests": len(results),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {
+            "mean": round(statistics.mean(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(max(latencies), 4) if latencies else 0.0
+        },
+        "max_schedule_lag_s": round(max(lags), 4) if lags else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded VoiceBot traffic")
+    parser.add_argument("--log-file", default=Config.LOG_FILE_PATH)
+    parser.add_argument("--target", default="inprocess",
+                        help="'inprocess' (VoiceBotWeb with a mock LLM) or a base URL such as http://localhost:5000")
+    parser.add_argument("--speed", default="1",
+                        help="replay speed multiplier, or 'max' to send as fast as workers allow")
+    parser.add_argument("--repeat", type=int, default=1, help="overlay the trace N times with distinct sessions")
+    parser.add_argument("--max-gap", type=float, default=30.0, help="compress idle gaps longer than this (seconds)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--first-token-latency", type=float, default=Config.MOCK_LLM_FIRST_TOKEN_LATENCY)
+    parser.add_argument("--tokens-per-second", type=float, default=Config.MOCK_LLM_TOKENS_PER_SECOND)
+    parser.add_argument("--real-llm", action="store_true",
+                        help="allow HTTP replays against a server that calls Groq (costs real tokens)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    trace = load_trace(args.log_file, args.max_gap, args.repeat)
+    if not trace:
+        print("No interactions to replay")
+        return
+    speed = None if args.speed == "max" else float(args.speed)
+    print(f"Replaying {len(trace)} requests spanning {trace[-1]['offset']:.1f}s of recorded time "
+          f"at {args.speed}{'' if speed is None else 'x'} speed")
+
+    if args.target == "inprocess":
+        tracemalloc.start()
+        target = InProcessTarget(trace, args)
+    else:
+        target = HTTPTarget(args.target, args.timeout)
+        if not target.uses_mock_llm() and not args.real_llm:
+            print("The server calls Groq; restart it with VOICEBOT_MOCK_LLM=true or pass --real-llm")
+            return
+
+    if isinstance(target, HTTPTarget):
+        target.start_memory_sampling()
+    report = replay(trace, target, speed, args.concurrency)
+    report["target"] = args.target
+    report["speed"] = args.speed
+    if isinstance(target, HTTPTarget):
+        # Memory of the server, not of this client; empty if the server cannot report it
+        report["server_memory_mb"] = target.stop_memory_sampling()
+    else:
+        report["python_heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["process_max_rss_mb"] = round(maxrss / (2**20 if sys.platform == "darwin" else 2**10), 2)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Write `data` to `path` so readers see either the old or the new file, never a partial one"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None):
+    atomic_write_bytes(path, json.dumps(data, indent=indent).encode())
+
+class WriteAheadJournal:
+    """Append-only journal of state changes with group-commit fsync.
+
+    Each record is one line: a CRC32 of the JSON payload followed by the
+    payload. Writers enqueue records and wait for them to become durable; a
+    single flusher thread writes and fsyncs whatever has queued up, so
+    concurrent turns share one fsync.
+
+    Participants (the interaction log, session histories) register under a
+    record type. They mutate their in-memory state and append the matching
+    record while holding `lock`. Every `checkpoint_interval` records the
+    participants write snapshots and the journal is truncated; on startup
+    `recover()` replays the surviving records into them. Participants must
+    tolerate replaying a record already contained in their snapshot, which
+    happens if the process dies between a snapshot and the truncation.
+    """
+    def __init__(self, path: str, checkpoint_interval: int = 50):
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.lock = threading.RLock()
+
+        self._participants: Dict[str, Any] = {}
+        self._cond = threading.Condition()
+        self._queue: List[bytes] = []
+        self._next_seq = 1
+        self._durable_seq = 0
+        self._since_checkpoint = 0
+        self._error: Optional[Exception] = None
+        self._closing = False
+        self._io_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, 'ab')
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def register(self, participant):
+        """Register an object with `journal_type`, `replay(record)` and `checkpoint()`"""
+        self._participants[participant.journal_type] = participant
+
+    def append(self, record_type: str, payload: Dict[str, Any]) -> int:
+        """Queue a record and return its sequence number; see wait_durable"""
+        data = json.dumps(dict(payload, type=record_type), separators=(',', ':')).encode()
+        line = b"%08x %s\n" % (zlib.crc32(data), data)
+        with self._cond:
+            if self._error is not None:
+                raise self._error
+            seq = self._next_seq
+            self._next_seq += 1
+            self._queue.append(line)
+            self._since_checkpoint += 1
+            self._cond.notify_all()
+        return seq
+
+    def wait_durable(self, seq: int):
+        with self._cond:
+            while self._durable_seq < seq and self._error is None:
+                self._cond.wait()
+            if self._durable_seq < seq:
+                raise self._error
+
+    def sync(self):
+        with self._cond:
+            last = self._next_seq - 1
+        self.wait_durable(last)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = self._queue
+                self._queue = []
+                last = self._next_seq - 1
+            try:
+                with self._io_lock:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"Journal write failed: {e}")
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable_seq = last
+                self._cond.notify_all()
+
+    def maybe_checkpoint(self):
+        if self._since_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Snapshot every participant, then drop the journal records they now contain"""
+        with self.lock:
+            if self._since_checkpoint == 0:
+                return
+            self.sync()
+            for participant in self._participants.values():
+                participant.checkpoint()
+            with self._io_lock:
+                self._file.truncate(0)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._since_checkpoint = 0
+
+    def read_records(self) -> List[Dict[str, Any]]:
+        """Read intact records, stopping at the first torn or corrupt line"""
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                for line_number, line in enumerate(f, start=1):
+                    try:
+                        crc, data = line.rstrip(b"\n").split(b" ", 1)
+                        if not line.endswith(b"\n") or int(crc, 16) != zlib.crc32(data):
+                            raise ValueError("checksum mismatch")
+                        records.append(json.loads(data))
+                    except ValueError:
+                        print(f"Journal {self.path} is damaged at line {line_number}; ignoring the rest")
+                        break
+        except FileNotFoundError:
+            pass
+        return records
+
+    def recover(self) -> int:
+        """Replay journal records into the registered participants and checkpoint them"""
+        records = self.read_records()
+        with self.lock:
+            for record in records:
+                participant = self._participants.get(record.get("type"))
+                if participant is None:
+                    print(f"Skipping journal record of unknown type: {record.get('type')}")
+                    continue
+                participant.replay(record)
+            if records:
+                print(f"Recovered {len(records)} journal records")
+            if os.path.getsize(self.path) > 0:
+                # Also clears a torn tail, which would otherwise hide records appended after it
+                self._since_checkpoint = max(1, len(records))
+                self.checkpoint()
+        return len(records)
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._file.close()
@@ -3,49 +3,152 @@ import os
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from crewai.tools import BaseTool
+from tools.log_index import LogIndex
+from tools.journal import WriteAheadJournal, atomic_write_bytes, atomic_write_json
 
 class JSONLoggerTool(BaseTool):
     name: str = "JSON Logger Tool"
     description: str = "Logs user queries and responses to a JSON file"
     log_file_path: str = 'logs/user_queries.json'
+    index: Any = None
+    index_save_interval: int = 25
+    unsaved_index_entries: int = 0
+    # Entries are made durable in the journal first and folded into the JSON file at checkpoints
+    journal: Any = None
+    journal_type: str = "log"
+    pending_entries: Any = None
+    checkpointed_count: int = 0
+    replay_keys: Any = None
+    # Byte range of every checkpointed entry in the log file, so entries can be read by doc id
+    entry_spans: Any = None
     
     class Config:
         arbitrary_types_allowed = True
     
-    def __init__(self, log_file_path: str = 'logs/user_queries.json'):
+    def __init__(self, log_file_path: str = 'logs/user_queries.json', index_save_interval: int = 25,
+                 journal: Optional[WriteAheadJournal] = None):
+        """Without a journal the tool keeps its own next to the log file and recovers it immediately.
+        A shared journal is recovered by its owner once every participant has registered."""
         super().__init__()
         self.log_file_path = log_file_path
+        self.index_save_interval = index_save_interval
+        self.pending_entries = []
         self._ensure_log_directory()
+        logs, self.entry_spans = self._load_checkpoint()
+        self.checkpointed_count = len(logs)
+        self._load_index(logs)
+        
+        owns_journal = journal is None
+        if owns_journal:
+            journal = WriteAheadJournal(os.path.splitext(self.log_file_path)[0] + '.journal')
+        self.journal = journal
+        self.journal.register(self)
+        if owns_journal:
+            self.journal.recover()
     
     def _ensure_log_directory(self):
         os.makedirs(os.path.dirname(self.log_file_path), exist_ok=True)
         
         # Create empty JSON file if it doesn't exist
         if not os.path.exists(self.log_file_path):
-            with open(self.log_file_path, 'w') as f:
-                json.dump([], f)
+            atomic_write_json(self.log_file_path, [])
+    
+    def _read_checkpoint(self) -> tuple:
+        """Parse the log file, returning its entries and the byte range of each one"""
+        with open(self.log_file_path, 'rb') as f:
+            text = f.read().decode('utf-8')
+        logs = json.loads(text)
+        if not isinstance(logs, list):
+            raise ValueError("expected a JSON array")
+        decoder = json.JSONDecoder()
+        spans = []
+        position = byte_position = 0
+        for _ in logs:
+            start = text.index('{', position)
+            end = decoder.raw_decode(text, start)[1]
+            start_byte = byte_position + len(text[position:start].encode())
+            byte_position = start_byte + len(text[start:end].encode())
+            spans.append((start_byte, byte_position))
+            position = end
+        return logs, spans
+    
+    def _load_checkpoint(self) -> tuple:
+        try:
+            return self._read_checkpoint()
+        except ValueError as e:
+            # Left behind by a crash during a non-atomic write; keep it for inspection
+            damaged_path = f"{self.log_file_path}.damaged-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            print(f"Log file {self.log_file_path} is unreadable ({e}); moved to {damaged_path}")
+            os.replace(self.log_file_path, damaged_path)
+            atomic_write_json(self.log_file_path, [])
+            return [], []
+    
+    def _read_spans(self, spans: list) -> list:
+        if not spans:
+            return []
+        with open(self.log_file_path, 'rb') as f:
+            entries = []
+            for start, end in spans:
+                f.seek(start)
+                entries.append(json.loads(f.read(end - start)))
+            return entries
+    
+    def _get_entries(self, doc_ids: List[int]) -> List[Dict[str, Any]]:
+        """Fetch entries by doc id: checkpointed ones from their byte range, the rest from memory"""
+        with self.journal.lock:
+            total = self.checkpointed_count + len(self.pending_entries)
+            located = [
+                self.entry_spans[doc_id] if doc_id < self.checkpointed_count
+                else self.pending_entries[doc_id - self.checkpointed_count]
+                for doc_id in doc_ids if doc_id < total
+            ]
+        # Checkpoints only append to the file, so these ranges stay valid after the lock is released
+        stored = iter(self._read_spans([item for item in located if isinstance(item, tuple)]))
+        return [next(stored) if isinstance(item, tuple) else item for item in located]
+    
+    def _load_index(self, logs: list):
+        index_path = os.path.splitext(self.log_file_path)[0] + '_index.json'
+        self.index = LogIndex(index_path)
+        self.index.load()
+        if self.index.catch_up(logs):
+            self.index.save()
+    
+    def _add_entry(self, log_entry: Dict[str, Any]):
+        self.pending_entries.append(log_entry)
+        
+        # Keep the search index current; it only needs persisting now and then
+        self.index.add(self.checkpointed_count + len(self.pending_entries) - 1, log_entry)
+        self.unsaved_index_entries += 1
+    
+    def _maybe_save_index(self):
+        # Called without the journal lock so writers never wait on a whole-index save
+        if self.unsaved_index_entries >= self.index_save_interval:
+            self.unsaved_index_entries = 0
+            self.index.save()
+    
+    def append_entry(self, query: str, response: str = "", query_type: str = "user_query",
+                     session_id: Optional[str] = None) -> int:
+        """Journal a log entry without waiting for it to be durable; returns its journal sequence number"""
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "query": query,
+            "response": response,
+            "query_type": query_type,
+            "session_id": session_id or self._get_session_id()
+        }
+        with self.journal.lock:
+            self._add_entry(log_entry)
+            seq = self.journal.append(self.journal_type, {"entry": log_entry})
+        self._maybe_save_index()
+        return seq
     
     def _run(self, query: str, response: str = "", query_type: str = "user_query", session_id: Optional[str] = None) -> str:
         try:
-            # Load existing logs
-            with open(self.log_file_path, 'r') as f:
-                logs = json.load(f)
+            seq = self.append_entry(query, response, query_type, session_id)
             
-            # Create new log entry
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "query": query,
-                "response": response,
-                "query_type": query_type,
-                "session_id": session_id or self._get_session_id()
-            }
-            
-            # Add to logs
-            logs.append(log_entry)
-            
-            # Save back to file
-            with open(self.log_file_path, 'w') as f:
-                json.dump(logs, f, indent=2)
+            # Concurrent turns share a single fsync here
+            self.journal.wait_durable(seq)
+            self.journal.maybe_checkpoint()
             
             print(f"Logged query: {query}")
             return f"Successfully logged query: {query}"
@@ -53,23 +156,74 @@ class JSONLoggerTool(BaseTool):
         except Exception as e:
             return f"Error logging to JSON: {e}"
     
+    @staticmethod
+    def _entry_key(log_entry: Dict[str, Any]) -> tuple:
+        return (log_entry.get("timestamp"), log_entry.get("session_id"), log_entry.get("query"))
+    
+    def replay(self, record: Dict[str, Any]):
+        log_entry = record["entry"]
+        # A crash between checkpoint and journal truncation leaves entries in both places;
+        # such entries can only be among the most recently checkpointed ones
+        if self.replay_keys is None:
+            recent = self._read_spans(self.entry_spans[-self.journal.checkpoint_interval * 2:])
+            self.replay_keys = {self._entry_key(log) for log in recent}
+        key = self._entry_key(log_entry)
+        if key in self.replay_keys:
+            return
+        self.replay_keys.add(key)
+        self._add_entry(log_entry)
+    
+    def checkpoint(self):
+        """Fold pending entries into the JSON file; called by the journal with its lock held"""
+        self.replay_keys = None
+        if not self.pending_entries:
+            return
+        with open(self.log_file_path, 'rb') as f:
+            data = f.read()
+        # Existing entries keep their byte ranges; new ones go in before the closing bracket
+        parts = [data[:data.rindex(b']')].rstrip()]
+        size = len(parts[0])
+        spans = []
+        for log_entry in self.pending_entries:
+            separator = b",\n  " if self.entry_spans or spans else b"\n  "
+            encoded = json.dumps(log_entry, indent=2).replace("\n", "\n  ").encode()
+            start = size + len(separator)
+            size = start + len(encoded)
+            parts += [separator, encoded]
+            spans.append((start, size))
+        parts.append(b"\n]")
+        atomic_write_bytes(self.log_file_path, b"".join(parts))
+        self.entry_spans.extend(spans)
+        self.checkpointed_count = len(self.entry_spans)
+        self.pending_entries = []
+    
     def _get_session_id(self) -> str:
         # Simple session ID based on current hour
         return datetime.now().strftime("%Y%m%d_%H")
     
     def get_recent_logs(self, limit: int = 10) -> list:
         try:
-            with open(self.log_file_path, 'r') as f:
-                logs = json.load(f)
-            return logs[-limit:] if logs else []
-        except:
+            with self.journal.lock:
+                total = self.checkpointed_count + len(self.pending_entries)
+            return self._get_entries(range(max(0, total - limit), total))
+        except (OSError, ValueError) as e:
+            print(f"Error reading logs: {e}")
             return []
-
+    
     def get_session_logs(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         try:
-            with open(self.log_file_path, 'r') as f:
-                logs = json.load(f)
-            session_logs = [log for log in logs if log.get("session_id") == session_id]
-            return session_logs[-limit:] if session_logs else []
-        except:
-            return []
\ No newline at end of file
+            return self._get_entries(self.index.session_docs(session_id, limit))
+        except (OSError, ValueError) as e:
+            print(f"Error reading logs: {e}")
+            return []
+    
+    def search_logs(self, query: str, session_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over logged queries and responses; quoted text matches as a phrase"""
+        doc_ids = self.index.search(query, session_id=session_id, limit=limit)
+        if not doc_ids:
+            return []
+        try:
+            return self._get_entries(doc_ids)
+        except (OSError, ValueError) as e:
+            print(f"Error searching logs: {e}")
+            return []
@@ -0,0 +1,205 @@
+import bisect
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+class LogIndex:
+    """Inverted index over the `query` and `response` text of interaction logs.
+
+    Documents are identified by their position in the log array. Postings keep
+    token positions so quoted phrases can be matched; response positions start
+    after a one-slot gap so a phrase never spans the query/response boundary.
+
+    The index is persisted as flat, delta-encoded integer lists. Entries logged
+    after the last save are re-indexed from the log file on startup, so saving
+    only needs to happen every few appends. A save may include entries that are
+    still only in the journal; those are dropped on load and re-added when the
+    journal is replayed.
+    """
+    VERSION = 1
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.doc_count = 0
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        self.sessions: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        # Concurrent saves would otherwise share the temporary file
+        self._save_lock = threading.Lock()
+
+    def add(self, doc_id: int, entry: Dict[str, Any]):
+        query_tokens = tokenize(entry.get("query", ""))
+        response_tokens = tokenize(entry.get("response", ""))
+        tokens = query_tokens + [None] + response_tokens
+        with self._lock:
+            for position, token in enumerate(tokens):
+                if token is not None:
+                    self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+            session_id = entry.get("session_id")
+            if session_id:
+                self.sessions.setdefault(session_id, []).append(doc_id)
+            self.doc_count = max(self.doc_count, doc_id + 1)
+
+    def catch_up(self, logs: List[Dict[str, Any]]) -> int:
+        """Index entries appended since the index was last saved; returns how many were added"""
+        if self.doc_count > len(logs):
+            # Saved before those entries were checkpointed; replaying the journal re-adds them
+            self.truncate(len(logs))
+        start = self.doc_count
+        for doc_id in range(start, len(logs)):
+            self.add(doc_id, logs[doc_id])
+        return len(logs) - start
+
+    def truncate(self, doc_count: int):
+        """Forget every doc id from `doc_count` on"""
+        with self._lock:
+            for term in list(self.postings):
+                docs = self.postings[term]
+                for doc_id in [doc_id for doc_id in docs if doc_id >= doc_count]:
+                    del docs[doc_id]
+                if not docs:
+                    del self.postings[term]
+            for session_id in list(self.sessions):
+                doc_ids = self.sessions[session_id][:bisect.bisect_left(self.sessions[session_id], doc_count)]
+                if doc_ids:
+                    self.sessions[session_id] = doc_ids
+                else:
+                    del self.sessions[session_id]
+            self.doc_count = min(self.doc_count, doc_count)
+
+    def clear(self):
+        self.truncate(0)
+
+    def session_docs(self, session_id: str, limit: int) -> List[int]:
+        """The latest `limit` doc ids logged for a session, oldest first"""
+        with self._lock:
+            return self.sessions.get(session_id, [])[-limit:] if limit > 0 else []
+
+    def search(self, query: str, session_id: Optional[str] = None, limit: int = 20) -> List[int]:
+        """Return matching doc ids, best match first (ties broken by recency).
+
+        Every word must match; text in double quotes must match as a phrase.
+        """
+        terms: List[str] = []
+        phrases: List[List[str]] = []
+        for phrase, word in QUERY_PATTERN.findall(query or ""):
+            tokens = tokenize(phrase if phrase else word)
+            if phrase and len(tokens) > 1:
+                phrases.append(tokens)
+            terms.extend(tokens)
+        if not terms:
+            return []
+
+        with self._lock:
+            term_postings = []
+            for term in set(terms):
+                postings = self.postings.get(term)
+                if not postings:
+                    return []
+                term_postings.append(postings)
+            term_postings.sort(key=len)
+
+            candidates = set(term_postings[0])
+            for postings in term_postings[1:]:
+                candidates.intersection_update(postings)
+            if session_id is not None:
+                candidates.intersection_update(self.sessions.get(session_id, ()))
+
+            scored = []
+            for doc_id in candidates:
+                if all(self._has_phrase(doc_id, phrase) for phrase in phrases):
+                    score = sum(len(postings[doc_id]) for postings in term_postings)
+                    scored.append((score, doc_id))
+
+        scored.sort(reverse=True)
+        return [doc_id for _, doc_id in scored[:limit]]
+
+    def _has_phrase(self, doc_id: int, phrase: List[str]) -> bool:
+        starts = set(self.postings[phrase[0]][doc_id])
+        for offset, token in enumerate(phrase[1:], start=1):
+            positions = set(self.postings[token][doc_id])
+            starts = {start for start in starts if start + offset in positions}
+            if not starts:
+                return False
+        return True
+
+    def load(self) -> bool:
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION:
+            return False
+
+        postings: Dict[str, Dict[int, List[int]]] = {}
+        for term, flat in data.get("postings", {}).items():
+            docs: Dict[int, List[int]] = {}
+            doc_id, i = 0, 0
+            while i < len(flat):
+                doc_id += flat[i]
+                count = flat[i + 1]
+                positions, position = [], 0
+                for delta in flat[i + 2:i + 2 + count]:
+                    position += delta
+                    positions.append(position)
+                docs[doc_id] = positions
+                i += 2 + count
+            postings[term] = docs
+
+        sessions: Dict[str, List[int]] = {}
+        for session_id, deltas in data.get("sessions", {}).items():
+            doc_ids, doc_id = [], 0
+            for delta in deltas:
+                doc_id += delta
+                doc_ids.append(doc_id)
+            sessions[session_id] = doc_ids
+
+        with self._lock:
+            self.doc_count = data.get("doc_count", 0)
+            self.postings = postings
+            self.sessions = sessions
+        return True
+
+    def save(self):
+        with self._save_lock:
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            postings = {}
+            for term, docs in self.postings.items():
+                flat, previous_doc = [], 0
+                for doc_id in sorted(docs):
+                    positions = docs[doc_id]
+                    flat.append(doc_id - previous_doc)
+                    flat.append(len(positions))
+                    previous_position = 0
+                    for position in positions:
+                        flat.append(position - previous_position)
+                        previous_position = position
+                    previous_doc = doc_id
+                postings[term] = flat
+            sessions = {
+                session_id: [doc_id - previous for previous, doc_id in zip([0] + doc_ids, doc_ids)]
+                for session_id, doc_ids in self.sessions.items()
+            }
+            data = {
+                "version": self.VERSION,
+                "doc_count": self.doc_count,
+                "sessions": sessions,
+                "postings": postings
+            }
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,72 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from tools.journal import WriteAheadJournal, atomic_write_json
+
+class SessionHistoryStore:
+    """Per-session conversation history that survives restarts.
+
+    Appends are journaled through the shared WriteAheadJournal; checkpoints
+    write the whole map to a JSON snapshot and drop sessions idle for longer
+    than `retention`.
+    """
+    journal_type = "history"
+
+    def __init__(self, snapshot_path: str, journal: WriteAheadJournal, max_items: int = 50,
+                 retention: timedelta = timedelta(days=7)):
+        self.snapshot_path = snapshot_path
+        self.journal = journal
+        self.max_items = max_items
+        self.retention = retention
+        self.histories: Dict[str, List[Dict[str, Any]]] = self._load_snapshot()
+        self.journal.register(self)
+
+    def _load_snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Session snapshot {self.snapshot_path} is unreadable ({e}); starting without it")
+            return {}
+
+    def get(self, session_id: str) -> list:
+        return self.histories.get(session_id, [])
+
+    def _add_item(self, session_id: str, item: Dict[str, Any]):
+        history = self.histories.setdefault(session_id, [])
+        history.append(item)
+        # keep last N to bound memory
+        if len(history) > self.max_items:
+            self.histories[session_id] = history[-self.max_items:]
+
+    def record(self, session_id: str, query: str, response: str) -> int:
+        """Journal a history item without waiting for it to be durable; returns its journal sequence number"""
+        item = {
+            "timestamp": datetime.now().isoformat(),
+            "query": query,
+            "response": response
+        }
+        with self.journal.lock:
+            self._add_item(session_id, item)
+            return self.journal.append(self.journal_type, {"session_id": session_id, "item": item})
+    
+    def replay(self, record: Dict[str, Any]):
+        session_id = record["session_id"]
+        item = record["item"]
+        history = self.histories.get(session_id)
+        # Items already in the snapshot are not newer than its last entry
+        if history and history[-1]["timestamp"] >= item["timestamp"]:
+            return
+        self._add_item(session_id, item)
+
+    def checkpoint(self):
+        """Write the snapshot; called by the journal with its lock held"""
+        cutoff = (datetime.now() - self.retention).isoformat()
+        expired = [sid for sid, history in self.histories.items() if not history or history[-1]["timestamp"] < cutoff]
+        for session_id in expired:
+            del self.histories[session_id]
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        atomic_write_json(self.snapshot_path, self.histories)
@@ -1,59 +1,200 @@
 import speech_recognition as sr
 import pyttsx3
 import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
 from typing import Optional, Any
 from crewai.tools import BaseTool
+from config import Config as AppConfig
+from tools.journal import atomic_write_json
 
 class SpeechRecognitionTool(BaseTool):
     name: str = "Speech Recognition Tool"
     description: str = "Converts speech to text using Google Speech Recognition API"
     recognizer: Any = None
     microphone: Any = None
+    source: Any = None
+    device_name: str = ""
+    calibration_path: str = ""
+    stream_lock: Any = None
+    stop_tracking: Any = None
+    listen_requested: Any = None
+    speaking: Any = None
+    tracker: Any = None
     
     class Config:
         arbitrary_types_allowed = True
     
-    def __init__(self):
+    def __init__(self, device_name: Optional[str] = None, calibration_path: Optional[str] = None,
+                 speaking: Optional[threading.Event] = None):
+        """`speaking` is shared with TextToSpeechTool; noise tracking pauses while it is set"""
         super().__init__()
         self.recognizer = sr.Recognizer()
+        self.calibration_path = calibration_path or AppConfig.MIC_CALIBRATION_PATH
+        self.stream_lock = threading.Lock()
+        self.stop_tracking = threading.Event()
+        self.listen_requested = threading.Event()
+        self.speaking = speaking or threading.Event()
         
-        # List available microphones and select the first one
         mic_names = sr.Microphone.list_microphone_names()
         if not mic_names:
             raise Exception("No microphones found")
             
         print(f"Available microphones: {mic_names}")
-        # Use the first microphone in the list (index 0)
-        self.microphone = sr.Microphone(device_index=0)
+        device_index = self._select_device(mic_names, device_name or AppConfig.MICROPHONE_NAME)
+        self.device_name = mic_names[device_index]
+        print(f"Using microphone: {self.device_name}")
+        self.microphone = sr.Microphone(device_index=device_index)
         
-        # Adjust for ambient noise
-        try:
-            with self.microphone as source:
+        # Open the capture stream once and keep it for the lifetime of the tool
+        self._open_stream()
+        
+        threshold = self._load_calibration()
+        if threshold is not None:
+            self.recognizer.energy_threshold = threshold
+            print(f"Loaded noise calibration: energy threshold {threshold:.0f}")
+        else:
+            try:
                 print("Adjusting for ambient noise...")
-                self.recognizer.adjust_for_ambient_noise(source)
+                self.recognizer.adjust_for_ambient_noise(self.source)
                 print("Ambient noise adjustment complete")
+                self._save_calibration()
+            except Exception as e:
+                print(f"Error during ambient noise adjustment: {e}")
+                raise
+        
+        # Keep tracking the noise floor between turns; this also drains audio
+        # buffered while nobody is listening so each turn starts from live input
+        self.tracker = threading.Thread(target=self._track_noise, daemon=True)
+        self.tracker.start()
+    
+    @staticmethod
+    def _select_device(mic_names: list, device_name: Optional[str]) -> int:
+        if device_name:
+            wanted = device_name.lower()
+            for index, name in enumerate(mic_names):
+                if wanted in name.lower():
+                    return index
+            print(f"Microphone '{device_name}' not found, using the first device")
+        return 0
+    
+    def _open_stream(self):
+        self.source = self.microphone.__enter__()
+    
+    def _close_stream(self):
+        if self.source is not None:
+            try:
+                self.microphone.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing microphone stream: {e}")
+            self.source = None
+    
+    def _drain_stream(self):
+        """Drop audio buffered while nobody was reading the stream, such as our own speech"""
+        stream = getattr(self.source.stream, "pyaudio_stream", None)
+        available = stream.get_read_available() if stream is not None else 0
+        if available:
+            self.source.stream.read(available)
+    
+    def _load_calibration(self) -> Optional[float]:
+        try:
+            with open(self.calibration_path, 'r') as f:
+                calibration = json.load(f)
+            return float(calibration[self.device_name]["energy_threshold"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _save_calibration(self):
+        try:
+            try:
+                with open(self.calibration_path, 'r') as f:
+                    calibration = json.load(f)
+            except (OSError, ValueError):
+                calibration = {}
+            calibration[self.device_name] = {
+                "energy_threshold": self.recognizer.energy_threshold,
+                "updated": datetime.now().isoformat()
+            }
+            os.makedirs(os.path.dirname(self.calibration_path), exist_ok=True)
+            # Replace atomically: the file holds the calibration of every device
+            atomic_write_json(self.calibration_path, calibration, indent=2)
         except Exception as e:
-            print(f"Error during ambient noise adjustment: {e}")
-            raise
+            print(f"Error saving noise calibration: {e}")
+    
+    def _track_noise(self):
+        last_saved = time.monotonic()
+        after_playback = False
+        while not self.stop_tracking.is_set():
+            if self.listen_requested.is_set():
+                # A turn is starting or in progress; leave the stream to it
+                self.stop_tracking.wait(0.05)
+                continue
+            if self.speaking.is_set():
+                # Calibrating on our own voice would raise the threshold above normal speech
+                after_playback = True
+                self.stop_tracking.wait(0.05)
+                continue
+            with self.stream_lock:
+                stream_open = self.source is not None
+                if stream_open:
+                    try:
+                        if after_playback:
+                            self._drain_stream()
+                            after_playback = False
+                        self.recognizer.adjust_for_ambient_noise(
+                            self.source, duration=AppConfig.NOISE_TRACKING_WINDOW
+                        )
+                    except Exception as e:
+                        # Leave the broken stream for the next _run to reopen
+                        print(f"Error tracking ambient noise: {e}")
+                        self._close_stream()
+            if not stream_open:
+                self.stop_tracking.wait(0.5)
+                continue
+            if time.monotonic() - last_saved >= AppConfig.NOISE_CALIBRATION_SAVE_INTERVAL:
+                self._save_calibration()
+                last_saved = time.monotonic()
+    
+    def close(self):
+        """Stop background tracking, persist the calibration and release the microphone"""
+        self.stop_tracking.set()
+        with self.stream_lock:
+            self._save_calibration()
+            self._close_stream()
     
     def _run(self, audio_data: Optional[Any] = None) -> str:
         try:
             if audio_data is None:
-                # Record audio from microphone
+                # Record audio from the already open microphone stream
+                self.listen_requested.set()
                 try:
-                    with self.microphone as source:
+                    with self.stream_lock:
+                        if self.source is None:
+                            self._open_stream()
                         print("Listening...")
                         print("Please speak now...")
-                        # Increase timeout to give more time for speech input
-                        audio_data = self.recognizer.listen(
-                            source, 
-                            timeout=10,  # Increased from 5 to 10 seconds
-                            phrase_time_limit=15  # Increased from 10 to 15 seconds
-                        )
+                        try:
+                            # Start from live input, not the tail of our own reply
+                            self._drain_stream()
+                            # Increase timeout to give more time for speech input
+                            audio_data = self.recognizer.listen(
+                                self.source, 
+                                timeout=10,  # Increased from 5 to 10 seconds
+                                phrase_time_limit=15  # Increased from 10 to 15 seconds
+                            )
+                        except OSError:
+                            # The device went away or overflowed; reopen on the next turn
+                            self._close_stream()
+                            raise
                         print("Audio captured successfully")
                 except Exception as e:
                     print(f"Error capturing audio: {e}")
                     return f"Error capturing audio: {e}"
+                finally:
+                    self.listen_requested.clear()
             
             # Convert speech to text
             try:
@@ -78,13 +219,16 @@ class TextToSpeechTool(BaseTool):
     name: str = "Text to Speech Tool"
     description: str = "Converts text to speech using pyttsx3"
     engine: Any = None
+    speaking: Any = None
     
     class Config:
         arbitrary_types_allowed = True
     
-    def __init__(self):
+    def __init__(self, speaking: Optional[threading.Event] = None):
+        """`speaking` is set for as long as audio is playing"""
         super().__init__()
         self.engine = pyttsx3.init()
+        self.speaking = speaking or threading.Event()
         
         # Configure TTS settings
         voices = self.engine.getProperty('voices')
@@ -101,8 +245,12 @@ class TextToSpeechTool(BaseTool):
     def _run(self, text: str) -> str:
         try:
             print(f"Speaking: {text}")
-            self.engine.say(text)
-            self.engine.runAndWait()
+            self.speaking.set()
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            finally:
+                self.speaking.clear()
             return f"Successfully spoke: {text}"
         except Exception as e:
             return f"Error in text-to-speech: {e}"
\ No newline at end of file
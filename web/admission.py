@@ -0,0 +1,157 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being queued"""
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class TokenBucket:
+    """Per-session token bucket refilled continuously at `rate` tokens/second"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # `now` may predate construction when the caller read the clock first
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def try_take(self, now: float) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds until one is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """Admission layer in front of process_text_query.
+
+    A request is rejected up front when the queue is full or the expected
+    queueing delay plus service time would overrun its deadline. Otherwise it
+    takes a token from its session's bucket and waits in a priority queue
+    (lower priority value first, earliest deadline next) for one of
+    `max_concurrent` slots, and is dropped from the queue as soon as its
+    deadline can no longer be met.
+    """
+    def __init__(self, max_concurrent: int = 4, session_rate: float = 0.5,
+                 session_burst: int = 5, max_queue: int = 32,
+                 initial_service_time: float = 2.0, max_sessions: int = 10000):
+        self.max_concurrent = max_concurrent
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_queue = max_queue
+        self.max_sessions = max_sessions
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queue: list[tuple] = []
+        self._seq = itertools.count()
+        self._buckets: dict[str, TokenBucket] = {}
+        # Exponentially weighted moving average of observed service time
+        self._service_time = initial_service_time
+
+    def _bucket(self, session_id: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_sessions:
+                # Drop buckets that have fully refilled; they carry no state
+                self._buckets = {sid: b for sid, b in self._buckets.items() if not b.is_idle(now)}
+            bucket = TokenBucket(self.session_rate, self.session_burst)
+            self._buckets[session_id] = bucket
+        return bucket
+
+    def _expected_wait(self, position: int) -> float:
+        # Each "round" of max_concurrent requests ahead of us costs one service time
+        ahead = self._active + position - self.max_concurrent + 1
+        if ahead <= 0:
+            return 0.0
+        return (ahead + self.max_concurrent - 1) // self.max_concurrent * self._service_time
+
+    def _acquire(self, session_id: str | None, priority: int, deadline: float,
+                 cancelled: Callable[[], bool] | None):
+        now = time.monotonic()
+        with self._cond:
+            if cancelled is not None and cancelled():
+                raise AdmissionRejected("Request cancelled", 0)
+
+            if len(self._queue) >= self.max_queue:
+                raise AdmissionRejected("Server is busy", self._expected_wait(len(self._queue)))
+
+            expected_wait = self._expected_wait(len(self._queue))
+            if now + expected_wait + self._service_time > deadline:
+                raise AdmissionRejected("Request cannot be completed before its deadline",
+                                        expected_wait or self._service_time)
+
+            # Only requests that actually get queued cost the session a token
+            if session_id:
+                wait = self._bucket(session_id, now).try_take(now)
+                if wait > 0:
+                    raise AdmissionRejected("Rate limit exceeded for this session", wait)
+
+            ticket = (priority, deadline, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            while self._active >= self.max_concurrent or self._queue[0] != ticket:
+                remaining = deadline - self._service_time - time.monotonic()
+                dropped = None
+                if remaining <= 0:
+                    dropped = AdmissionRejected("Request expired while queued", self._service_time)
+                elif cancelled is not None and cancelled():
+                    dropped = AdmissionRejected("Request cancelled while queued", 0)
+                if dropped is not None:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    raise dropped
+                # Cancellation is not signalled through the condition, so poll for it
+                self._cond.wait(remaining if cancelled is None else min(remaining, 0.1))
+            heapq.heappop(self._queue)
+            self._active += 1
+            # Another slot may still be free for the next ticket in line
+            self._cond.notify_all()
+
+    def _release(self, started: float):
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self._active -= 1
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, session_id: str | None = None, priority: int = 0, timeout: float = 30.0,
+              cancelled: Callable[[], bool] | None = None):
+        """Hold a processing slot for the duration of the block or raise AdmissionRejected.
+
+        With `cancelled`, a queued request gives up its place as soon as it returns true.
+        """
+        self._acquire(session_id, priority, time.monotonic() + timeout, cancelled)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "avg_service_time": round(self._service_time, 3)
+            }
@@ -1,5 +1,9 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, g
 import uuid
+import hmac
+import threading
+import time
+import json
 from datetime import datetime
 import sys
 import os
@@ -8,14 +12,93 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from voicebot_web import VoiceBotWeb
+from admission import AdmissionController, AdmissionRejected
+from conversation import ConversationChannel
+from profiler import SamplingProfiler, write_profile
 from config import Config
 
+# WebSocket support is optional; the web UI falls back to plain HTTP without it
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# Memory figures in /api/health are only available on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'
+sock = Sock(app) if Sock else None
 
 # Global VoiceBot instance
 voicebot = None
 
+admission = AdmissionController(
+    max_concurrent=Config.MAX_CONCURRENT_REQUESTS,
+    session_rate=Config.SESSION_RATE_LIMIT,
+    session_burst=Config.SESSION_BURST,
+    max_queue=Config.MAX_QUEUED_REQUESTS
+)
+
+def request_deadline() -> float:
+    """Seconds the client is willing to wait, capped by the server-wide deadline"""
+    try:
+        requested = float(request.headers.get('X-Request-Deadline', Config.REQUEST_DEADLINE))
+    except ValueError:
+        requested = Config.REQUEST_DEADLINE
+    return max(0.0, min(requested, Config.REQUEST_DEADLINE))
+
+def rejected_response(rejection: AdmissionRejected):
+    response = jsonify({'error': rejection.reason, 'retry_after': rejection.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response
+
+def is_admin_request() -> bool:
+    """Admin access needs VOICEBOT_ADMIN_TOKEN configured and sent back in X-Admin-Token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(Config.ADMIN_TOKEN) and hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
+
+# Profiling window started from the admin endpoint, if any
+window_profiler = None
+window_profile_result = None
+window_lock = threading.Lock()
+
+if Config.PROFILING_ENABLED:
+    @app.before_request
+    def start_request_profiler():
+        wants_profile = request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+        if wants_profile and is_admin_request():
+            g.profiler = SamplingProfiler(Config.PROFILE_SAMPLE_INTERVAL, thread_ids=[threading.get_ident()])
+            g.profiler.start()
+
+    @app.after_request
+    def stop_request_profiler(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            paths = write_profile(profiler, Config.PROFILE_DIR, f"{request.method}_{request.path}",
+                                  Config.PROFILE_MAX_KEPT)
+            response.headers['X-Profile-Output'] = os.path.basename(paths['flamegraph'])
+        return response
+
+def process_memory() -> dict:
+    """Current and peak resident set size of the server process in MB (None where unavailable)"""
+    memory = {'rss_mb': None, 'max_rss_mb': None}
+    try:
+        with open('/proc/self/statm') as f:
+            memory['rss_mb'] = round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20, 2)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory['max_rss_mb'] = round(maxrss / (2**20 if sys.platform == 'darwin' else 2**10), 2)
+    return memory
+
 def init_voicebot():
     global voicebot
     if voicebot is None:
@@ -32,6 +115,9 @@ def init_voicebot():
 
 @app.route('/')
 def index():
+    # Assign the session up front so the WebSocket handshake already carries it
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
     return render_template('index.html')
 
 @app.route('/api/process-voice', methods=['POST'])
@@ -53,7 +139,11 @@ def process_voice():
             return jsonify({'error': 'VoiceBot initialization failed'}), 500
         
         # Process the text query using direct method with session memory
-        result = bot.process_text_query(user_text, session_id=session['session_id'])
+        try:
+            with admission.admit(session['session_id'], timeout=request_deadline()):
+                result = bot.process_text_query(user_text, session_id=session['session_id'])
+        except AdmissionRejected as rejection:
+            return rejected_response(rejection)
         
         if result["success"]:
             result['session_id'] = session['session_id']
@@ -64,6 +154,17 @@ def process_voice():
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+if sock is not None:
+    @sock.route('/ws/conversation')
+    def conversation(ws):
+        bot = init_voicebot()
+        if bot is None:
+            ws.send(json.dumps({'type': 'error', 'error': 'VoiceBot initialization failed'}))
+            return
+        # The handshake carries the Flask session cookie, but it cannot be updated from here
+        session_id = session.get('session_id') or str(uuid.uuid4())
+        ConversationChannel(ws, bot, session_id, admission, request_deadline()).run()
+
 @app.route('/api/get-logs')
 def get_logs():
     try:
@@ -83,11 +184,84 @@ def get_logs():
     except Exception as e:
         return jsonify({'error': f'Error retrieving logs: {str(e)}'}), 500
 
+@app.route('/api/search-logs')
+def search_logs():
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'No search query provided'}), 400
+        
+        bot = init_voicebot()
+        if bot is None:
+            return jsonify({'error': 'VoiceBot not initialized'}), 500
+        
+        # Callers search their own session; session=all or another session id needs the admin token
+        scope = request.args.get('session', 'current')
+        if scope == 'current':
+            session_id = session.get('session_id')
+            if session_id is None:
+                return jsonify({'success': True, 'results': []})
+        elif not is_admin_request():
+            return jsonify({'error': 'Searching other sessions requires the admin token'}), 403
+        else:
+            session_id = None if scope == 'all' else scope
+        
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        results = bot.json_logger.search_logs(query, session_id=session_id, limit=limit)
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'Error searching logs: {str(e)}'}), 500
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    global window_profiler
+    if not Config.PROFILING_ENABLED:
+        return jsonify({'error': 'Profiling is disabled (set VOICEBOT_PROFILING=true)'}), 404
+    if not is_admin_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    with window_lock:
+        running = window_profiler is not None and window_profiler.is_running()
+        if request.method == 'GET':
+            return jsonify({'success': True, 'running': running, 'last_result': window_profile_result})
+        if running:
+            return jsonify({'error': 'A profiling window is already running'}), 409
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get('seconds', 30))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'seconds must be a number'}), 400
+        seconds = max(1.0, min(seconds, Config.PROFILE_MAX_WINDOW))
+        
+        # Sample every thread so the window covers all concurrent requests
+        profiler = SamplingProfiler(Config.PROFILE_SAMPLE_INTERVAL)
+        profiler.start()
+        window_profiler = profiler
+    
+    def finish_window():
+        global window_profile_result
+        time.sleep(seconds)
+        profiler.stop()
+        paths = write_profile(profiler, Config.PROFILE_DIR, "window", Config.PROFILE_MAX_KEPT)
+        with window_lock:
+            window_profile_result = {name: os.path.basename(path) for name, path in paths.items()}
+    
+    threading.Thread(target=finish_window, daemon=True).start()
+    return jsonify({'success': True, 'running': True, 'seconds': seconds})
+
 @app.route('/api/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
         'voicebot_initialized': voicebot is not None,
+        'admission': admission.stats(),
+        'websocket': sock is not None,
+        'mock_llm': Config.MOCK_LLM,
+        'memory': process_memory(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -105,7 +279,7 @@ def get_history():
         return jsonify({'error': f'Error retrieving history: {str(e)}'}), 500
 
 if __name__ == '__main__':
-    if not Config.GROQ_API_KEY:
+    if not Config.GROQ_API_KEY and not Config.MOCK_LLM:
         print("Error: GROQ_API_KEY environment variable not set!")
         exit(1)
     
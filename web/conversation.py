@@ -0,0 +1,138 @@
+import json
+import threading
+from datetime import datetime
+
+from admission import AdmissionController, AdmissionRejected
+
+
+class ConversationChannel:
+    """Full-duplex conversation over a single WebSocket.
+
+    Client -> server messages:
+      {"type": "query", "id": ..., "text": ...}   start a turn (cancels any turn in flight)
+      {"type": "interim", "text": ...}            interim transcript; barges in on a streaming reply
+      {"type": "cancel"}                          stop the turn in flight
+      {"type": "history"}                         request a history push
+      {"type": "ping"}
+
+    Server -> client messages:
+      ready, token, done, cancelled, history, error, pong
+    """
+    def __init__(self, ws, bot, session_id: str, admission: AdmissionController, deadline: float):
+        self.ws = ws
+        self.bot = bot
+        self.session_id = session_id
+        self.admission = admission
+        self.deadline = deadline
+
+        self._send_lock = threading.Lock()
+        self._turn_thread: threading.Thread | None = None
+        self._turn_cancel: threading.Event | None = None
+        self._closed = threading.Event()
+
+    def send(self, message: dict):
+        if self._closed.is_set():
+            return
+        try:
+            with self._send_lock:
+                self.ws.send(json.dumps(message))
+        except Exception:
+            # Socket went away mid-turn; the receive loop will notice and shut down
+            self._closed.set()
+
+    def run(self):
+        self.send({"type": "ready", "session_id": self.session_id})
+        try:
+            while not self._closed.is_set():
+                try:
+                    raw = self.ws.receive()
+                except Exception:
+                    break
+                if raw is None:
+                    break
+                try:
+                    message = json.loads(raw)
+                except (TypeError, ValueError):
+                    self.send({"type": "error", "error": "Invalid message"})
+                    continue
+                self._dispatch(message)
+        finally:
+            self._closed.set()
+            self._cancel_turn()
+
+    def _dispatch(self, message: dict):
+        kind = message.get("type")
+        if kind == "query":
+            text = str(message.get("text", "")).strip()
+            if not text:
+                self.send({"type": "error", "id": message.get("id"), "error": "No text provided"})
+                return
+            self._start_turn(message.get("id"), text)
+        elif kind == "interim":
+            # The user started speaking again: stop talking over them
+            if self._turn_active():
+                self._cancel_turn()
+        elif kind == "cancel":
+            self._cancel_turn()
+        elif kind == "history":
+            self._push_history()
+        elif kind == "ping":
+            self.send({"type": "pong"})
+        else:
+            self.send({"type": "error", "error": f"Unknown message type: {kind}"})
+
+    def _turn_active(self) -> bool:
+        return self._turn_thread is not None and self._turn_thread.is_alive()
+
+    def _cancel_turn(self):
+        if self._turn_cancel is not None:
+            self._turn_cancel.set()
+
+    def _start_turn(self, turn_id, text: str):
+        self._cancel_turn()
+        cancel = threading.Event()
+        self._turn_cancel = cancel
+        self._turn_thread = threading.Thread(target=self._run_turn, args=(turn_id, text, cancel), daemon=True)
+        self._turn_thread.start()
+
+    def _run_turn(self, turn_id, text: str, cancel: threading.Event):
+        def cancelled() -> bool:
+            return cancel.is_set() or self._closed.is_set()
+
+        try:
+            with self.admission.admit(self.session_id, timeout=self.deadline, cancelled=cancelled):
+                result = self.bot.stream_text_query(
+                    text,
+                    session_id=self.session_id,
+                    on_token=lambda token: self.send({"type": "token", "id": turn_id, "text": token}),
+                    cancelled=cancelled
+                )
+        except AdmissionRejected as rejection:
+            if cancelled():
+                self.send({"type": "cancelled", "id": turn_id})
+            else:
+                self.send({"type": "error", "id": turn_id, "error": rejection.reason,
+                           "retry_after": rejection.retry_after})
+            return
+
+        if result.get("cancelled"):
+            self.send({"type": "cancelled", "id": turn_id})
+        elif result["success"]:
+            self.send({
+                "type": "done",
+                "id": turn_id,
+                "assistant_response": result["assistant_response"],
+                "has_more": result.get("has_more", False),
+                "timestamp": result["timestamp"]
+            })
+            self._push_history()
+        else:
+            self.send({"type": "error", "id": turn_id, "error": result.get("error", "Unknown error")})
+
+    def _push_history(self):
+        try:
+            logs = self.bot.json_logger.get_session_logs(self.session_id, limit=20)
+        except Exception as e:
+            self.send({"type": "error", "error": f"Error retrieving logs: {str(e)}"})
+            return
+        self.send({"type": "history", "logs": logs, "timestamp": datetime.now().isoformat()})
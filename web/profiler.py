@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from html import escape
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples Python stacks from a background thread.
+
+    Only the sampler thread does any work; profiled threads run untouched, so
+    overhead is a stack walk per target thread every `interval` seconds.
+    Samples are aggregated as collapsed stacks ("root;caller;callee" -> count).
+    """
+    def __init__(self, interval: float = 0.005, thread_ids: list[int] | None = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples: Counter = Counter()
+        self.started_at: float | None = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.monotonic() - self.started_at
+        return self.samples
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            targets = self.thread_ids if self.thread_ids is not None else frames.keys()
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                self.samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return ";".join(stack)
+
+
+def render_flamegraph(samples: Counter, title: str, width: int = 1200, row_height: int = 16) -> str:
+    """Render collapsed stacks as a self-contained SVG flame graph"""
+    root = {"count": 0, "children": {}}
+    max_depth = 0
+    for stack, count in samples.items():
+        node = root
+        node["count"] += count
+        frames = stack.split(";")
+        max_depth = max(max_depth, len(frames))
+        for name in frames:
+            node = node["children"].setdefault(name, {"count": 0, "children": {}})
+            node["count"] += count
+
+    total = root["count"] or 1
+    header = 24
+    height = header + (max_depth + 1) * row_height
+    scale = width / total
+    rects = []
+
+    def draw(name: str, node: dict, x: float, depth: int):
+        node_width = node["count"] * scale
+        if node_width < 0.1:
+            return
+        y = height - (depth + 1) * row_height
+        # Stable warm colour per frame name, as in classic flame graphs
+        hue = zlib.crc32(name.encode()) % 60
+        label = escape(name)
+        percent = 100.0 * node["count"] / total
+        rects.append(
+            f'<g><title>{label} ({node["count"]} samples, {percent:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row_height - 1}" '
+            f'fill="hsl({hue},90%,60%)"/>'
+        )
+        if node_width > 40:
+            max_chars = int(node_width / 7)
+            text = name if len(name) <= max_chars else name[:max_chars - 2] + ".."
+            rects.append(f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{escape(text)}</text></g>')
+        else:
+            rects.append('</g>')
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            draw(child_name, child, child_x, depth + 1)
+            child_x += child["count"] * scale
+
+    draw("all", root, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#fafafa"/>'
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">{escape(title)}</text>'
+        + "".join(rects) + '</svg>'
+    )
+
+
+def prune_profiles(output_dir: str, keep: int):
+    """Delete all but the newest `keep` profiles (file names start with their timestamp)"""
+    bases = sorted({os.path.splitext(name)[0] for name in os.listdir(output_dir)
+                    if name.endswith((".collapsed", ".svg"))})
+    for base in bases[:-keep] if keep > 0 else bases:
+        for extension in (".collapsed", ".svg"):
+            try:
+                os.remove(os.path.join(output_dir, base + extension))
+            except FileNotFoundError:
+                pass
+
+def write_profile(profiler: SamplingProfiler, output_dir: str, label: str, keep: int = 50) -> dict:
+    """Save collapsed stacks and a flame graph, keeping at most `keep` profiles; returns the written file paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+    base = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{safe_label}")
+
+    collapsed_path = base + ".collapsed"
+    with open(collapsed_path, 'w') as f:
+        for stack, count in sorted(profiler.samples.items()):
+            f.write(f"{stack} {count}\n")
+
+    svg_path = base + ".svg"
+    title = f"{label}: {sum(profiler.samples.values())} samples over {profiler.duration:.2f}s"
+    with open(svg_path, 'w') as f:
+        f.write(render_flamegraph(profiler.samples, title))
+
+    prune_profiles(output_dir, keep)
+    return {"collapsed": collapsed_path, "flamegraph": svg_path}
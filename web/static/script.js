@@ -3,13 +3,122 @@ class VoiceBotApp {
         this.isListening = false;
         this.recognition = null;
         this.synthesis = window.speechSynthesis;
+        this.socket = null;
+        this.pendingTurn = null;
+        this.turnCounter = 0;
+        this.reconnectDelay = 1000;
         
         this.initElements();
         this.initSpeechRecognition();
+        this.initSocket();
         this.bindEvents();
         this.loadLogs();
     }
     
+    initSocket() {
+        if (!('WebSocket' in window)) return;
+        
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        let socket;
+        try {
+            socket = new WebSocket(`${protocol}//${window.location.host}/ws/conversation`);
+        } catch (error) {
+            console.warn('WebSocket unavailable, using HTTP:', error);
+            return;
+        }
+        
+        let opened = false;
+        socket.onopen = () => {
+            opened = true;
+            this.socket = socket;
+            this.reconnectDelay = 1000;
+            console.log('Conversation socket connected');
+        };
+        
+        socket.onmessage = (event) => this.handleSocketMessage(JSON.parse(event.data));
+        
+        socket.onclose = () => {
+            this.socket = null;
+            this.failPendingTurn('Connection lost. Please try again.');
+            // Server without WebSocket support: stay on HTTP
+            if (!opened) return;
+            setTimeout(() => this.initSocket(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, 30000);
+        };
+    }
+    
+    socketReady() {
+        return this.socket && this.socket.readyState === WebSocket.OPEN;
+    }
+    
+    sendSocket(message) {
+        if (this.socketReady()) {
+            this.socket.send(JSON.stringify(message));
+        }
+    }
+    
+    handleSocketMessage(message) {
+        const turn = this.pendingTurn;
+        const forTurn = turn && message.id === turn.id;
+        
+        switch (message.type) {
+            case 'token':
+                if (!forTurn) return;
+                if (!turn.element) {
+                    turn.element = this.addMessage('', 'assistant');
+                }
+                turn.text += message.text;
+                turn.element.textContent = turn.text;
+                this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+                break;
+            case 'done':
+                if (!forTurn) return;
+                if (!turn.element) {
+                    turn.element = this.addMessage('', 'assistant');
+                }
+                turn.element.textContent = message.assistant_response;
+                this.speakResponse(message.assistant_response);
+                if (message.has_more) this.offerContinuation();
+                this.finishTurn();
+                break;
+            case 'cancelled':
+                if (forTurn) this.finishTurn();
+                break;
+            case 'history':
+                this.displayLogs(message.logs);
+                break;
+            case 'error':
+                if (message.id === undefined || forTurn) {
+                    this.showError(message.error || 'Failed to process query');
+                    if (forTurn) this.finishTurn();
+                }
+                break;
+        }
+    }
+    
+    finishTurn() {
+        const turn = this.pendingTurn;
+        this.pendingTurn = null;
+        if (turn) turn.resolve();
+    }
+    
+    failPendingTurn(errorMessage) {
+        if (this.pendingTurn) {
+            this.showError(errorMessage);
+            this.finishTurn();
+        }
+    }
+    
+    sendQueryOverSocket(query) {
+        // A new query replaces one still streaming; the server cancels it
+        this.finishTurn();
+        return new Promise(resolve => {
+            const id = ++this.turnCounter;
+            this.pendingTurn = { id, text: '', element: null, resolve };
+            this.sendSocket({ type: 'query', id, text: query });
+        });
+    }
+    
     initElements() {
         this.micButton = document.getElementById('micButton');
         this.pauseTtsButton = document.getElementById('pauseTtsButton');
@@ -49,7 +158,7 @@ class VoiceBotApp {
             });
         
         this.recognition.continuous = false;
-        this.recognition.interimResults = false;
+        this.recognition.interimResults = true;
         this.recognition.lang = 'en-US';
         // Increase timeout for recognition
         this.recognition.maxAlternatives = 1;
@@ -61,8 +170,20 @@ class VoiceBotApp {
         };
         
         this.recognition.onresult = (event) => {
-            if (event.results.length > 0 && event.results[0].length > 0) {
-                const transcript = event.results[0][0].transcript;
+            if (event.results.length === 0) {
+                this.showError('No speech detected. Please try again.');
+                return;
+            }
+            
+            let interim = '';
+            for (let i = event.resultIndex; i < event.results.length; i++) {
+                const result = event.results[i];
+                if (result.length === 0) continue;
+                const transcript = result[0].transcript;
+                if (!result.isFinal) {
+                    interim += transcript;
+                    continue;
+                }
                 console.log('Speech recognized:', transcript);
                 if (transcript.trim()) {
                     this.textInput.value = transcript;
@@ -70,8 +191,13 @@ class VoiceBotApp {
                 } else {
                     this.showError('Empty speech detected. Please try speaking more clearly.');
                 }
-            } else {
-                this.showError('No speech detected. Please try again.');
+            }
+            
+            if (interim) {
+                this.textInput.value = interim;
+                // The user is talking again: stop speaking and let the server drop a reply still streaming
+                this.synthesis.cancel();
+                this.sendSocket({ type: 'interim', text: interim });
             }
         };
         
@@ -168,9 +294,17 @@ class VoiceBotApp {
         
         this.addMessage(query, 'user');
         this.textInput.value = '';
-        this.setProcessingState(true);
         
         try {
+            if (this.socketReady()) {
+                // Keep the mic usable so the user can barge in on the streaming reply
+                this.setProcessingState(true, true);
+                await this.sendQueryOverSocket(query);
+                return;
+            }
+            
+            this.setProcessingState(true);
+            
             const response = await fetch('/api/process-voice', {
                 method: 'POST',
                 headers: {
@@ -184,6 +318,7 @@ class VoiceBotApp {
             if (data.success) {
                 this.addMessage(data.assistant_response, 'assistant');
                 this.speakResponse(data.assistant_response);
+                if (data.has_more) this.offerContinuation();
                 this.loadLogs(); // Refresh logs after successful interaction
             } else {
                 this.showError(data.error || 'Failed to process query');
@@ -192,7 +327,7 @@ class VoiceBotApp {
             this.showError('Network error. Please check your connection.');
             console.error('Error processing query:', error);
         } finally {
-            this.setProcessingState(false);
+            if (!this.pendingTurn) this.setProcessingState(false);
         }
     }
     
@@ -212,6 +347,20 @@ class VoiceBotApp {
         
         this.chatMessages.appendChild(messageDiv);
         this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
+        return contentDiv;
+    }
+    
+    offerContinuation() {
+        // The reply was kept short for voice; let the user ask for the rest
+        const button = document.createElement('button');
+        button.className = 'more-button';
+        button.textContent = 'Tell me more';
+        button.addEventListener('click', () => {
+            button.remove();
+            this.processQuery('tell me more');
+        });
+        this.chatMessages.lastElementChild.appendChild(button);
+        this.chatMessages.scrollTop = this.chatMessages.scrollHeight;
     }
     
     speakResponse(text) {
@@ -247,6 +396,11 @@ class VoiceBotApp {
     }
 
     togglePauseTts() {
+        // While a reply is still streaming, the pause button stops generation instead
+        if (this.pendingTurn) {
+            this.sendSocket({ type: 'cancel' });
+            return;
+        }
         try {
             if (!this.synthesis) return;
             if (this.synthesis.speaking && !this.synthesis.paused) {
@@ -263,9 +417,9 @@ class VoiceBotApp {
         }
     }
     
-    setProcessingState(isProcessing) {
+    setProcessingState(isProcessing, allowBargeIn = false) {
         this.sendButton.disabled = isProcessing;
-        this.micButton.disabled = isProcessing;
+        this.micButton.disabled = isProcessing && !allowBargeIn;
         
         if (isProcessing) {
             this.micButton.classList.add('processing');
@@ -279,6 +433,10 @@ class VoiceBotApp {
     }
     
     async loadLogs() {
+        if (this.socketReady()) {
+            this.sendSocket({ type: 'history' });
+            return;
+        }
         try {
             const response = await fetch('/api/get-logs');
             const data = await response.json();
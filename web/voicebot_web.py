@@ -1,6 +1,7 @@
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Callable
 import sys
 import os
 
@@ -8,71 +9,100 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.voice_assistant import VoiceAssistantAgent, LoggerAgent
+from agents.mock_llm import MockGroqClient, load_response_lengths
 from tools.json_logger import JSONLoggerTool
+from tools.journal import WriteAheadJournal
+from tools.session_store import SessionHistoryStore
 from config import Config
 
 class VoiceBotWeb:
     def __init__(self):
         self.config = Config
-        # Simple in-memory conversation history per session_id
-        self.session_histories: dict[str, list[dict]] = {}
+        # Log entries and session histories are journaled together and restored on startup
+        self.journal = WriteAheadJournal(self.config.JOURNAL_PATH, self.config.JOURNAL_CHECKPOINT_INTERVAL)
+        self.sessions = SessionHistoryStore(
+            self.config.SESSION_SNAPSHOT_PATH,
+            self.journal,
+            retention=timedelta(days=self.config.SESSION_RETENTION_DAYS)
+        )
+        self.session_histories: dict[str, list[dict]] = self.sessions.histories
         
         # No audio tools for web deployment
         self.speech_recognition = None
         self.text_to_speech = None
         
-        self.json_logger = JSONLoggerTool(self.config.LOG_FILE_PATH)
+        self.json_logger = JSONLoggerTool(self.config.LOG_FILE_PATH, journal=self.journal)
+        self.journal.recover()
         
         # Initialize agents WITHOUT CrewAI crew system
-        self.voice_assistant = VoiceAssistantAgent(self.config.GROQ_API_KEY)
-        self.logger_agent = LoggerAgent(self.config.GROQ_API_KEY)
+        # (with MOCK_LLM the Groq clients are still built but never called)
+        api_key = self.config.GROQ_API_KEY or ('mock' if self.config.MOCK_LLM else None)
+        self.voice_assistant = VoiceAssistantAgent(api_key)
+        self.logger_agent = LoggerAgent(api_key)
+        
+        if self.config.MOCK_LLM:
+            print("VOICEBOT_MOCK_LLM is set: replies come from the mock LLM, not Groq")
+            self.voice_assistant.groq_client = MockGroqClient(
+                load_response_lengths(self.config.LOG_FILE_PATH),
+                self.config.MOCK_LLM_FIRST_TOKEN_LATENCY,
+                self.config.MOCK_LLM_TOKENS_PER_SECOND
+            )
     
     def _get_history(self, session_id: str) -> list:
-        return self.session_histories.get(session_id, [])
+        return self.sessions.get(session_id)
 
-    def _append_history(self, session_id: str, query: str, response: str):
-        history = self.session_histories.setdefault(session_id, [])
-        history.append({
-            "timestamp": datetime.now().isoformat(),
-            "query": query,
-            "response": response
-        })
-        # keep last N to bound memory
-        if len(history) > 50:
-            self.session_histories[session_id] = history[-50:]
+    def _record_turn(self, query: str, response: str, query_type: str, session_id: str | None,
+                     remember: bool = True):
+        """Journal the log entry and (if `remember`) the history item, waiting once for both to be durable"""
+        seq = self.json_logger.append_entry(query, response, query_type, session_id)
+        if remember and session_id:
+            seq = self.sessions.record(session_id, query, response)
+        self.journal.wait_durable(seq)
+        self.journal.maybe_checkpoint()
+        print(f"Logged query: {query}")
 
     def process_text_query(self, query: str, session_id: str | None = None) -> dict:
         """Process text query without using CrewAI tasks"""
+        return self.stream_text_query(query, session_id=session_id)
+
+    def stream_text_query(self, query: str, session_id: str | None = None,
+                          on_token: Callable[[str], None] = lambda token: None,
+                          cancelled: Callable[[], bool] = lambda: False) -> dict:
+        """Process a text query, passing reply chunks to on_token as they arrive"""
         try:
             print(f"Processing query: {query}")
-            
-            # Prepare contextual history if available
+
             history = self._get_history(session_id) if session_id else []
-            
-            # Generate response using direct Groq client with context
-            assistant_response = self.voice_assistant.process_query(query, history=history)
-            
+
+            chunks = []
+            for token in self.voice_assistant.stream_query(query, history=history, cancelled=cancelled,
+                                                            session_id=session_id):
+                chunks.append(token)
+                on_token(token)
+            assistant_response = "".join(chunks)
             print(f"Generated response: {assistant_response}")
-            
-            # Log the interaction
-            self.json_logger._run(
-                query=query,
-                response=assistant_response,
-                query_type="direct_interaction",
-                session_id=session_id
-            )
-            
-            # Update in-memory history
-            if session_id:
-                self._append_history(session_id, query, assistant_response)
-            
+
+            if cancelled():
+                # Keep a partial reply in the log but out of the conversation context
+                if assistant_response:
+                    self._record_turn(query, assistant_response, "cancelled_interaction", session_id, remember=False)
+                return {
+                    "success": False,
+                    "cancelled": True,
+                    "user_query": query,
+                    "assistant_response": assistant_response
+                }
+
+            self._record_turn(query, assistant_response, "direct_interaction", session_id)
+
             return {
                 "success": True,
                 "user_query": query,
                 "assistant_response": assistant_response,
+                "has_more": self.voice_assistant.has_continuation(session_id),
                 "timestamp": datetime.now().isoformat()
             }
-            
+
         except Exception as e:
             error_msg = f"Error processing query: {str(e)}"
             print(error_msg)